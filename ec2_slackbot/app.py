@@ -8,6 +8,7 @@ from argparse import Namespace
 from typing import Dict
 
 import yaml
+from flask import Flask
 
 from .aws_handler import AWSHandler
 from .slack_handler import SlackHandler
@@ -41,6 +42,14 @@ def create_web_server(arguments: Namespace) -> WebServer:
     return web_server
 
 
+def create_app() -> Flask:
+    """
+    Create the Flask application for a WSGI server, configured by EC2_SLACKBOT_CONFIG.
+    """
+    config = os.environ.get("EC2_SLACKBOT_CONFIG", "config.yaml")
+    return create_web_server(Namespace(config=config)).app
+
+
 def main() -> None:
     """
     Main entry point for the application.
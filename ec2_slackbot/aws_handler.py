@@ -5,26 +5,39 @@ for handling AWS-related operations.
 
 from datetime import datetime
 from textwrap import dedent
-from time import sleep
-from typing import Any, Dict, List, Optional
+from time import monotonic, sleep
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import boto3
+from botocore.config import Config
 
 
 class AWSHandler:
     def __init__(
         self, config: Dict[str, Any], endpoint_url: Optional[str] = None
     ) -> None:
+        # Allow at least one connection per concurrent AWS command.
+        client_config = Config(
+            max_pool_connections=max(50, config.get("max_workers", 10))
+        )
         self.ec2_client = boto3.client(
-            "ec2", region_name=config["region"], endpoint_url=endpoint_url
+            "ec2",
+            region_name=config["region"],
+            endpoint_url=endpoint_url,
+            config=client_config,
         )
         self.sagemaker_client = boto3.client(
-            "sagemaker", region_name=config["region"], endpoint_url=endpoint_url
+            "sagemaker",
+            region_name=config["region"],
+            endpoint_url=endpoint_url,
+            config=client_config,
         )
         self.config = config
+        self.cache_ttl = config.get("cache_ttl_seconds", 900)
+        self.sagemaker_studio_uids: Dict[str, Tuple[float, Optional[str]]] = {}
 
     def get_instances_for_user(
-        self, user_name: str, states: List[str]
+        self, user_name: str, states: Sequence[str]
     ) -> Dict[str, Any]:
         return self.ec2_client.describe_instances(
             Filters=[
@@ -119,13 +132,19 @@ class AWSHandler:
         if "sagemaker_studio_domain_id" not in self.config:
             return None
 
+        cached = self.sagemaker_studio_uids.get(user_name)
+        if cached is not None and monotonic() - cached[0] < self.cache_ttl:
+            return cached[1]
+
         try:
-            return self.sagemaker_client.describe_user_profile(
+            uid = self.sagemaker_client.describe_user_profile(
                 DomainId=self.config["sagemaker_studio_domain_id"],
                 UserProfileName=user_name.replace(".", "-"),
             )["HomeEfsFileSystemUid"]
         except self.sagemaker_client.exceptions.ResourceNotFound:
-            return None
+            uid = None
+        self.sagemaker_studio_uids[user_name] = (monotonic(), uid)
+        return uid
 
     def create_key_pair(self, user_name: str, public_key: str) -> None:
         """
@@ -4,7 +4,7 @@ for periodically checking the running instances.
 """
 
 import threading
-import time
+from typing import Dict, List
 
 from .slack_handler import SlackHandler
 
@@ -18,6 +18,7 @@ class InstanceChecker:
         self.config = config
         self.slack_handler = slack_handler
         self.aws_handler = slack_handler.aws_handler
+        self.stop_event = threading.Event()
 
     def periodically_check_instances(self) -> None:
         """
@@ -27,6 +28,7 @@ class InstanceChecker:
         admin_id = user_ids.get(self.config.get("admin_user", None), None)
         instance_details = self.aws_handler.get_running_instance_details()
 
+        warnings: Dict[str, List[str]] = {}
         for instance in instance_details:
             instance_id = instance["instance_id"]
             instance_type = instance["instance_type"]
@@ -39,22 +41,26 @@ class InstanceChecker:
                     instance_cost >= self.config["large_instance_cost_threshold"]
                     and running_days >= self.config["large_instance_warning_days"]
                 ):
-                    message = (
-                        f"Warning: Your instance {instance_id} ({instance_type}) "
-                        f"has been running for {running_days} days. "
-                        "Please consider terminating it with /ec2 down."
-                    )
-                    admin_message = (
-                        f"Warning: {user_name} has had {instance_id} ({instance_type}) "
-                        f"running for {running_days} days."
-                    )
-                    self.slack_handler.send_warning(
-                        user_ids[user_name],
-                        admin_id,
-                        message,
-                        admin_message,
+                    warnings.setdefault(user_name, []).append(
+                        f"- {instance_id} ({instance_type}): {running_days} days\n"
                     )
 
+        for user_name, lines in warnings.items():
+            message = (
+                "Warning: The following instances have been running for a while. "
+                "Please consider terminating them with /ec2 down.\n" + "".join(lines)
+            )
+            admin_message = (
+                f"Warning: {user_name} has had the following instances running "
+                "for a while.\n" + "".join(lines)
+            )
+            self.slack_handler.send_warning(
+                user_ids[user_name],
+                admin_id,
+                message,
+                admin_message,
+            )
+
     def start_periodic_checks(self, interval: int) -> None:
         """
         Start the periodic checks with the given interval.
@@ -62,10 +68,17 @@ class InstanceChecker:
 
         def run_checks() -> None:
             """
-            Run the checks periodically.
+            Run the checks periodically until stopped.
             """
-            while True:
+            while not self.stop_event.is_set():
                 self.periodically_check_instances()
-                time.sleep(interval)
+                self.stop_event.wait(interval)
 
+        self.stop_event.clear()
         threading.Thread(target=run_checks, daemon=True).start()
+
+    def stop_periodic_checks(self) -> None:
+        """
+        Stop the periodic checks.
+        """
+        self.stop_event.set()
@@ -3,18 +3,34 @@ This module contains the SlackHandler class, which is responsible
 for handling Slack events and commands.
 """
 
+import hashlib
+import hmac
 import json
 import logging
 import os
-import threading
-from typing import Any, Dict, List, Optional
+import string
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Sequence
 
 from flask import Request, Response, jsonify
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
-from slack_sdk.signature import SignatureVerifier
 
 from .aws_handler import AWSHandler
+from .slack_sender import SlackSender
+
+# Characters allowed in the hex encoded signature.
+_HEX_DIGITS = frozenset(string.hexdigits)
+
+# Instance states that can be selected for each operation.
+_STATES = MappingProxyType(
+    {
+        "stop": ("running",),
+        "start": ("stopped",),
+        "terminate": ("pending", "running", "stopping", "stopped"),
+    }
+)
 
 
 class SlackHandler:
@@ -30,9 +46,48 @@ class SlackHandler:
         aws_handler: AWSHandler,
     ) -> None:
         self.client = WebClient(token=token)
+        # The sender retries rate limited messages, so it gets its own client to keep
+        # those retries away from the calls made while handling requests.
+        self.sender = SlackSender(
+            WebClient(token=token),
+            messages_per_second=config.get("messages_per_second", 1.0),
+            burst=config.get("message_burst", 3),
+        )
         self.config = config
         self.aws_handler = aws_handler
-        self.verifier = SignatureVerifier(signing_secret=signing_secret)
+        self.signing_key = hmac.new(signing_secret.encode(), digestmod=hashlib.sha256)
+        self.ami_options = [
+            {"text": {"type": "plain_text", "text": ami}, "value": ami}
+            for ami in self.config["amis"]
+        ]
+        self.instance_type_options = self.get_instance_type_options()
+        self.lookup_executor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="lookup"
+        )
+        self.command_executor = ThreadPoolExecutor(
+            max_workers=config.get("max_workers", 10), thread_name_prefix="command"
+        )
+
+    def verify_signature(self, body: bytes, timestamp: str, signature: str) -> bool:
+        """
+        Verify the Slack signature of a request.
+        """
+        # bytes.fromhex skips whitespace, so insist on exactly 64 hex digits first.
+        hex_signature = signature[3:]
+        if (
+            not signature.startswith("v0=")
+            or len(hex_signature) != 64
+            or not _HEX_DIGITS.issuperset(hex_signature)
+        ):
+            return False
+        expected = bytes.fromhex(hex_signature)
+        digest = self.signing_key.copy()
+        # Update with each part in turn, as concatenating them would copy the body.
+        digest.update(b"v0:")
+        digest.update(timestamp.encode())
+        digest.update(b":")
+        digest.update(body)
+        return hmac.compare_digest(digest.digest(), expected)
 
     def get_all_user_ids(self) -> Dict[str, str]:
         """
@@ -62,16 +117,26 @@ class SlackHandler:
         Send a warning message to the user and to the admin (optionally).
         """
         try:
-            self.client.chat_postMessage(channel=user_id, text=message)
+            self.sender.send(channel=user_id, text=message)
         except SlackApiError as e:
             logging.error("Error sending warning: %s", e.response["error"])
 
         if admin_id:
             try:
-                self.client.chat_postMessage(channel=admin_id, text=admin_message)
+                self.sender.send(channel=admin_id, text=admin_message)
             except SlackApiError as e:
                 logging.error("Error sending direct message: %s", e.response["error"])
 
+    def get_status(self, user_name: str) -> str:
+        """
+        Get the status of the user's running instances, or of everyone's for the admin.
+        """
+        if user_name != self.config.get("admin_user"):
+            user_names = [user_name]
+        else:
+            user_names = list(self.get_all_user_ids().keys())
+        return self.aws_handler.get_status(user_names)
+
     def get_request_data(self, request: Request) -> Optional[Dict[str, Any]]:
         """
         Get the data from the request based on the content type.
@@ -142,16 +207,12 @@ class SlackHandler:
             return self.open_instance_change_modal(trigger_id, user_name)
 
         if sub_command == "status":
-            if user_name != self.config.get("admin_user"):
-                user_names = [user_name]
-            else:
-                user_names = list(self.get_all_user_ids().keys())
             self.handle_aws_command(
-                function=self.aws_handler.get_status,
+                function=self.get_status,
                 user_id=user_id,
                 success_message="{}",
                 error_message="Error getting status.",
-                user_names=user_names,
+                user_name=user_name,
             )
             return jsonify(response_type="ephemeral", text="Fetching status...")
 
@@ -189,7 +250,7 @@ class SlackHandler:
             )
 
         if sub_command == "resize":
-            return self.open_volume_resize_modal(trigger_id, user_name)
+            return self.open_volume_resize_modal(trigger_id, volume)
 
         if sub_command == "attach":
             return self.open_volume_attach_modal(trigger_id, user_name)
@@ -238,7 +299,7 @@ class SlackHandler:
             for instance_type, cost in self.config["instance_types"].items()
         ]
 
-    def get_instance_options(self, user_name: str, states: List[str]) -> List:
+    def get_instance_options(self, user_name: str, states: Sequence[str]) -> List:
         """
         Retrieves instance options for a given user.
         """
@@ -296,17 +357,16 @@ class SlackHandler:
         """
         Opens the instance launch modal.
         """
-        ami_options = [
-            {"text": {"type": "plain_text", "text": ami}, "value": ami}
-            for ami in self.config["amis"]
-        ]
-        instance_type_options = self.get_instance_type_options()
         mount_options = [
             {"text": {"type": "plain_text", "text": "None"}, "value": "none"}
         ]
 
-        uid = self.aws_handler.get_sagemaker_studio_uid(user_name)
-        if uid is not None:
+        # Overlap the SageMaker and EC2 round trips.
+        uid_future = self.lookup_executor.submit(
+            self.aws_handler.get_sagemaker_studio_uid, user_name
+        )
+        volume = self.aws_handler.get_volume_for_user(user_name)
+        if uid_future.result() is not None:
             mount_options.extend(
                 [
                     {
@@ -325,7 +385,7 @@ class SlackHandler:
                     },
                 ]
             )
-        if self.aws_handler.get_volume_for_user(user_name) is not None:
+        if volume is not None:
             mount_options.append(
                 {
                     "text": {"type": "plain_text", "text": "Mount EBS Volume at $HOME"},
@@ -346,7 +406,7 @@ class SlackHandler:
                         "type": "static_select",
                         "action_id": "ami",
                         "placeholder": {"type": "plain_text", "text": "Select an AMI"},
-                        "options": ami_options,
+                        "options": self.ami_options,
                     },
                     "label": {"type": "plain_text", "text": "AMI"},
                 },
@@ -360,7 +420,7 @@ class SlackHandler:
                             "type": "plain_text",
                             "text": "Select Instance Type",
                         },
-                        "options": instance_type_options,
+                        "options": self.instance_type_options,
                     },
                     "label": {"type": "plain_text", "text": "Instance Type"},
                 },
@@ -435,12 +495,7 @@ class SlackHandler:
         """
         Opens the instance operation modal.
         """
-        states = {
-            "stop": ["running"],
-            "start": ["stopped"],
-            "terminate": ["pending", "running", "stopping", "stopped"],
-        }
-        instance_options = self.get_instance_options(user_name, states[command])
+        instance_options = self.get_instance_options(user_name, _STATES[command])
         if not instance_options:
             return jsonify(
                 response_type="ephemeral", text=f"No EC2 instances to {command}."
@@ -486,7 +541,6 @@ class SlackHandler:
             return jsonify(
                 response_type="ephemeral", text="No EC2 instances to change."
             )
-        instance_type_options = self.get_instance_type_options()
 
         modal = {
             "type": "modal",
@@ -514,7 +568,7 @@ class SlackHandler:
                             "type": "plain_text",
                             "text": "Select Instance Type",
                         },
-                        "options": instance_type_options,
+                        "options": self.instance_type_options,
                     },
                     "label": {"type": "plain_text", "text": "Instance Type"},
                 },
@@ -576,17 +630,12 @@ class SlackHandler:
 
         return Response(status=200)
 
-    def open_volume_resize_modal(self, trigger_id: str, user_name: str) -> Response:
+    def open_volume_resize_modal(
+        self, trigger_id: str, volume: Dict[str, Any]
+    ) -> Response:
         """
         Opens the volume resize modal.
         """
-        volume = self.aws_handler.get_volume_for_user(user_name)
-        if volume is None:
-            return jsonify(
-                response_type="ephemeral",
-                text="No EBS volume found. Please /ebs create first.",
-            )
-
         modal = {
             "type": "modal",
             "callback_id": "resize_volume",
@@ -670,7 +719,6 @@ class SlackHandler:
         user_name = payload["user"]["username"]
         callback_id = payload.get("view", {}).get("callback_id")
         values = payload.get("view", {}).get("state", {}).get("values")
-        volume = self.aws_handler.get_volume_for_user(user_name=user_name)
 
         if callback_id == "submit_key":
             public_key = values["key_input"]["public_key"]["value"]
@@ -695,6 +743,11 @@ class SlackHandler:
                 "value"
             ]
             startup_script = values["startup_script"]["startup_script_input"]["value"]
+            volume = (
+                self.aws_handler.get_volume_for_user(user_name=user_name)
+                if mount_option == "ebs"
+                else None
+            )
             function = self.aws_handler.launch_ec2_instance
             kwargs = {
                 "ami_id": ami["id"],
@@ -742,7 +795,8 @@ class SlackHandler:
             ]["value"]
             instance_type = self.aws_handler.get_instance_type(instance_id)
             if new_instance_type == instance_type:
-                self.client.chat_postMessage(
+                self.command_executor.submit(
+                    self.sender.send,
                     channel=user_id,
                     text=f"Instance {instance_id} is already of type {new_instance_type}.",
                 )
@@ -772,6 +826,7 @@ class SlackHandler:
         elif callback_id == "resize_volume":
             volume_size = int(values["volume_size"]["volume_size_input"]["value"])
             volume_size = min(volume_size, self.config["max_volume_size"])
+            volume = self.aws_handler.get_volume_for_user(user_name=user_name)
             function = self.aws_handler.resize_volume
             kwargs = {
                 "volume_id": volume["id"] if volume is not None else None,
@@ -787,6 +842,7 @@ class SlackHandler:
             instance_id = values["instance_selection"]["selected_instance"][
                 "selected_option"
             ]["value"]
+            volume = self.aws_handler.get_volume_for_user(user_name=user_name)
             function = self.aws_handler.attach_volume
             kwargs = {
                 "volume_id": volume["id"] if volume is not None else None,
@@ -818,7 +874,7 @@ class SlackHandler:
         **kwargs: Any,
     ) -> None:
         """
-        Handles AWS commands in a separate thread.
+        Handles AWS commands on the command executor.
         """
 
         def run_command() -> None:
@@ -827,12 +883,10 @@ class SlackHandler:
             """
             try:
                 response = function(**kwargs)
-                self.client.chat_postMessage(
-                    channel=user_id, text=success_message.format(response)
-                )
+                self.sender.send(channel=user_id, text=success_message.format(response))
             except self.aws_handler.ec2_client.exceptions.ClientError as e:
-                self.client.chat_postMessage(
-                    channel=user_id, text=error_message.format(e)
-                )
+                self.sender.send(channel=user_id, text=error_message.format(e))
+            except Exception:
+                logging.exception("Error running AWS command")
 
-        threading.Thread(target=run_command).start()
+        self.command_executor.submit(run_command)
@@ -0,0 +1,56 @@
+"""
+This module contains the SlackSender class, which is responsible
+for sending messages to Slack within its rate limits.
+"""
+
+import threading
+import time
+from typing import Callable, Dict
+
+from slack_sdk import WebClient
+from slack_sdk.http_retry import RateLimitErrorRetryHandler
+
+
+class SlackSender:
+    """
+    A class to send messages to Slack at no more than the allowed rate per channel.
+    """
+
+    def __init__(
+        self,
+        client: WebClient,
+        messages_per_second: float = 1.0,
+        burst: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if messages_per_second < 0:
+            raise ValueError(
+                f"messages_per_second must not be negative: {messages_per_second}"
+            )
+        if burst < 1:
+            raise ValueError(f"burst must be at least 1: {burst}")
+        self.client = client
+        self.client.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=3))
+        # A rate of zero turns pacing off.
+        self.interval = 1.0 / messages_per_second if messages_per_second > 0 else 0.0
+        self.burst = burst
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.next_send_times: Dict[str, float] = {}
+
+    def reserve(self, channel: str) -> float:
+        """
+        Reserve a slot to send a message to the channel and return how long to wait.
+        """
+        with self.lock:
+            now = self.clock()
+            next_send_time = max(self.next_send_times.get(channel, now), now)
+            self.next_send_times[channel] = next_send_time + self.interval
+            return max(next_send_time - now - (self.burst - 1) * self.interval, 0.0)
+
+    def send(self, channel: str, text: str) -> None:
+        """
+        Send a message to the channel, waiting for a free slot if necessary.
+        """
+        time.sleep(self.reserve(channel))
+        self.client.chat_postMessage(channel=channel, text=text)
@@ -3,7 +3,9 @@ This module contains the WebServer class, which is responsible
 for handling the web server for the application.
 """
 
+import time
 from typing import Any, Dict
+from urllib.parse import parse_qsl
 
 from flask import Flask, Response, abort, request
 
@@ -38,10 +40,18 @@ class WebServer:
             """
             Verify the Slack signature before processing the request.
             """
-            if request.path.startswith(
-                "/slack/"
-            ) and not self.slack_handler.verifier.is_valid_request(
-                body=request.get_data(), headers=request.headers
+            if not request.path.startswith("/slack/"):
+                return
+            timestamp = request.headers.get("X-Slack-Request-Timestamp", "")
+            if (
+                not (timestamp.isascii() and timestamp.isdecimal())
+                or len(timestamp) > 12
+                or abs(time.time() - int(timestamp)) > 60 * 5
+                or not self.slack_handler.verify_signature(
+                    body=request.get_data(),
+                    timestamp=timestamp,
+                    signature=request.headers.get("X-Slack-Signature", ""),
+                )
             ):
                 abort(Response(response="Invalid Slack signature", status=400))
 
@@ -60,7 +70,9 @@ class WebServer:
             """
             Handle incoming commands from Slack.
             """
-            data = request.form
+            data = dict(
+                parse_qsl(request.get_data(as_text=True), keep_blank_values=True)
+            )
             return self.slack_handler.handle_commands(data)
 
     def run(self) -> None:
@@ -70,4 +82,5 @@ class WebServer:
         self.app.run(
             host=self.config.get("host", "127.0.0.1"),
             port=self.config.get("port", 3000),
+            threaded=True,
         )
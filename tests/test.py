@@ -2,29 +2,32 @@
 A module to test the SlackHandler class. It uses localstack to mock the AWS services.
 """
 
-import hashlib
-import hmac
+import atexit
+import http.client
 import json
 import logging
 import os
-import re
+import queue
 import threading
 import time
 import unittest
 from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 from unittest.mock import Mock, patch
+from urllib.parse import urlencode, urlsplit
 
 import paramiko
-import requests
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives import hashes, hmac, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
 from flask import Flask
-from requests.auth import AuthBase
+from slack_sdk import WebClient
 from werkzeug.serving import make_server
 
 from ec2_slackbot.app import create_web_server
+from ec2_slackbot.slack_sender import SlackSender
+from ec2_slackbot.web_server import WebServer
 
 os.environ.update(
     {
@@ -39,39 +42,72 @@ if "TEST_ON_AWS" not in os.environ:
             "AWS_ACCESS_KEY_ID": "test",
             "AWS_SECRET_ACCESS_KEY": "test",
             "AWS_ENDPOINT_URL": "http://localhost:4566",
+            # Fail fast rather than backing off and retrying against localhost. The
+            # tests wait for LocalStack's EC2 service to be ready before starting.
+            "AWS_RETRY_MODE": "standard",
+            "AWS_MAX_ATTEMPTS": "1",
         }
     )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Time to wait for messages, which take much longer on AWS.
+TIMEOUT_SECONDS = 2 if "TEST_ON_AWS" not in os.environ else 300
 
-class SlackAuth(AuthBase):
+# Time to wait for HTTP responses, which allows for the synchronous AWS calls made
+# by slash commands when testing on AWS.
+HTTP_TIMEOUT_SECONDS = 2 if "TEST_ON_AWS" not in os.environ else 5
+
+# Fail fast instead of hanging if the server never becomes healthy.
+STARTUP_TIMEOUT_SECONDS = 30
+
+# Pre-serialized payload for the stop, start and terminate instance submissions.
+INSTANCE_SELECTION_PAYLOAD = json.dumps(
+    {
+        "type": "view_submission",
+        "user": {"id": "__USER_ID__", "username": "__USER_NAME__"},
+        "view": {
+            "callback_id": "__CALLBACK_ID__",
+            "state": {
+                "values": {
+                    "instance_selection": {
+                        "selected_instances": {
+                            "selected_options": [{"value": "__INSTANCE_ID__"}]
+                        }
+                    }
+                }
+            },
+        },
+    }
+)
+
+
+class SlackAuth:
     """
-    A class to authenticate requests to the Slack API.
+    A class to sign requests as Slack does.
     """
 
     def __init__(self, secret: Optional[str] = None) -> None:
         self.secret = secret or os.environ["SLACK_SIGNING_SECRET"]
-
-    def __call__(self, request: requests.PreparedRequest) -> requests.PreparedRequest:
-        """
-        Authenticate the request.
-        """
-        payload = request.body or ""
-        if isinstance(payload, bytes):
-            payload = payload.decode("utf-8")
-        timestamp = str(int(time.time()))
-        basestring = f"v0:{timestamp}:{payload}"
-        signature = (
-            "v0="
-            + hmac.new(
-                self.secret.encode(), basestring.encode(), hashlib.sha256
-            ).hexdigest()
-        )
-        request.headers["X-Slack-Request-Timestamp"] = timestamp
-        request.headers["X-Slack-Signature"] = signature
-        return request
+        self.hmac_template = hmac.HMAC(self.secret.encode(), hashes.SHA256())
+
+    def sign(self, body: bytes, timestamp: Optional[str] = None) -> Dict[str, str]:
+        """
+        Return the Slack signature headers for the body, signed now or at timestamp.
+        """
+        if timestamp is None:
+            timestamp = str(time.time_ns() // 1_000_000_000)
+        digest = self.hmac_template.copy()
+        # Feed the parts separately rather than copying the body into a new string.
+        digest.update(b"v0:")
+        digest.update(timestamp.encode("ascii"))
+        digest.update(b":")
+        digest.update(body)
+        return {
+            "X-Slack-Request-Timestamp": timestamp,
+            "X-Slack-Signature": "v0=" + digest.finalize().hex(),
+        }
 
 
 class ServerThread(threading.Thread):
@@ -81,34 +117,61 @@ class ServerThread(threading.Thread):
 
     def __init__(self, app: Flask, port: int) -> None:
         threading.Thread.__init__(self)
-        self.server = make_server("localhost", port, app)
+        self.daemon = True
+        self.server = make_server("localhost", port, app, threaded=True)
         self.ctx = app.app_context()
         self.ctx.push()
+        self.ready = threading.Event()
 
     def run(self) -> None:
         """
         Run the server.
         """
-        self.server.serve_forever()
+        self.ready.set()
+        self.server.serve_forever(poll_interval=0.05)
 
     def shutdown(self) -> None:
         """
-        Shutdown the server.
+        Shutdown the server and close its listening socket.
         """
         self.server.shutdown()
+        self.server.server_close()
 
 
-class TestSlackHandler(unittest.TestCase):
+class SharedServer:
     """
-    A class to test the SlackHandler class.
+    A class to hold the server shared by all the test classes in this module.
     """
 
+    web_server: WebServer
+    server: ServerThread
+    slack_auth: SlackAuth
+    port: int
+    executor: ThreadPoolExecutor
+    local = threading.local()
+    connections: List[http.client.HTTPConnection] = []
+
     @classmethod
-    def setUpClass(cls):
+    def start(cls) -> None:
         """
-        Set up the server and port before any tests run.
+        Start the server and wait until it is healthy.
         """
+        # A single deadline bounds waiting for LocalStack, the thread and health.
+        deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+        if "TEST_ON_AWS" not in os.environ:
+            endpoint = urlsplit(os.environ["AWS_ENDPOINT_URL"])
+            cls.wait_until_ready(
+                "LocalStack EC2",
+                endpoint.hostname or "localhost",
+                endpoint.port or 4566,
+                "/_localstack/health",
+                lambda body: json.loads(body)["services"].get("ec2")
+                in ("available", "running"),
+                deadline,
+            )
         cls.slack_auth = SlackAuth()
+        # Long-lived, so that its threads keep reusing their keep-alive connections.
+        cls.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="post")
         config = (
             "tests/config.yaml" if "TEST_ON_AWS" not in os.environ else "config.yaml"
         )
@@ -116,32 +179,119 @@ class TestSlackHandler(unittest.TestCase):
         cls.port = cls.web_server.config.get("port", 3000)
         cls.server = ServerThread(cls.web_server.app, cls.port)
         cls.server.start()
+        atexit.register(cls.server.shutdown)
+        if not cls.server.ready.wait(timeout=deadline - time.monotonic()):
+            raise RuntimeError(
+                f"Server thread did not start within {STARTUP_TIMEOUT_SECONDS}s"
+            )
+        cls.wait_until_ready(
+            "Server", "localhost", cls.port, "/healthz", lambda _: True, deadline
+        )
 
-        healthz_url = f"http://localhost:{cls.port}/healthz"
+    @staticmethod
+    def wait_until_ready(
+        name: str,
+        host: str,
+        port: int,
+        path: str,
+        is_ready: Callable[[bytes], bool],
+        deadline: float,
+    ) -> None:
+        """
+        Poll the health endpoint until it is ready or the deadline passes.
+        """
+        delay = 0.005
         while True:
+            if time.monotonic() > deadline:
+                raise RuntimeError(
+                    f"{name} did not become healthy within {STARTUP_TIMEOUT_SECONDS}s"
+                )
+            connection = http.client.HTTPConnection(host, port, timeout=0.5)
             try:
-                response = requests.get(healthz_url, timeout=1)
-                if response.status_code == 200:
-                    break
-            except requests.ConnectionError:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                if response.status == 200 and is_ready(response.read()):
+                    return
+            except (OSError, http.client.HTTPException, ValueError, KeyError):
                 pass
-            time.sleep(1)
+            finally:
+                connection.close()
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
 
     @classmethod
-    def tearDownClass(cls):
+    def post(
+        cls, path: str, fields: Dict[str, Any], as_json: bool = False
+    ) -> Tuple[int, bytes]:
+        """
+        Post signed form or JSON fields to the server and return the status and body.
+        """
+        connection = getattr(cls.local, "connection", None)
+        if connection is None:
+            connection = http.client.HTTPConnection(
+                "localhost", cls.port, timeout=HTTP_TIMEOUT_SECONDS
+            )
+            cls.local.connection = connection
+            cls.connections.append(connection)
+        if as_json:
+            body = json.dumps(fields).encode("utf-8")
+            headers = {"Content-Type": "application/json"}
+        else:
+            body = urlencode(fields).encode("utf-8")
+            headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        headers.update(cls.slack_auth.sign(body))
+        connection.request("POST", path, body, headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+
+    @classmethod
+    def stop(cls) -> None:
         """
-        Shutdown the server after all tests run.
+        Shutdown the server.
         """
+        cls.web_server.instance_checker.stop_periodic_checks()
+        atexit.unregister(cls.server.shutdown)
         cls.server.shutdown()
+        cls.executor.shutdown()
+        for connection in cls.connections:
+            connection.close()
+
+
+def setUpModule() -> None:
+    """
+    Start the shared server once before any tests in this module run.
+    """
+    SharedServer.start()
+
+
+def tearDownModule() -> None:
+    """
+    Shutdown the shared server after all tests in this module run.
+    """
+    SharedServer.stop()
+
+
+class TestSlackHandler(unittest.TestCase):
+    """
+    A class to test the SlackHandler class.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Set up the shared server and SSH key pair before any tests run.
+        """
+        cls.ssh_key_pair = cls.generate_ssh_key_pair()
+        cls.web_server = SharedServer.web_server
+        cls.port = SharedServer.port
 
     def setUp(self) -> None:
         """
         Set up the SlackHandler instance before each test.
         """
-        self.post_message_event = threading.Event()
-        self.text = ""
+        self.messages: queue.Queue = queue.Queue()
         self.port = self.__class__.port
-        self.timeout = 10 if "TEST_ON_AWS" not in os.environ else 300
+        self.timeout = TIMEOUT_SECONDS
         self.trigger_id = "12345.12345.12345"
         self.user_name = "testuser"
         self.user_id = "U12345"
@@ -151,94 +301,136 @@ class TestSlackHandler(unittest.TestCase):
             "user_name": self.user_name,
         }
         self.instance_id = None
+        self.created_resources = False
 
     def tearDown(self) -> None:
         """
         Clean up resources after each test.
         """
+        if not self.created_resources:
+            return
+
         ec2_client = self.web_server.slack_handler.aws_handler.ec2_client
-        instance_ids = [
-            instance["InstanceId"]
-            for instance in ec2_client.describe_instances(
-                Filters=[{"Name": "tag:User", "Values": [self.user_name]}]
-            )["Reservations"]
-            for instance in instance["Instances"]
-        ]
-        if len(instance_ids) > 0:
-            ec2_client.terminate_instances(InstanceIds=instance_ids)
-            waiters = ec2_client.get_waiter("instance_terminated")
-            waiters.wait(InstanceIds=instance_ids)
-        volume_ids = [
-            volume["VolumeId"]
-            for volume in ec2_client.describe_volumes(
-                Filters=[{"Name": "tag:User", "Values": [self.user_name]}]
-            )["Volumes"]
-        ]
-        if len(volume_ids) > 0:
-            ec2_client.delete_volume(VolumeId=volume_ids[0])
-            waiters = ec2_client.get_waiter("volume_deleted")
-            waiters.wait(VolumeIds=volume_ids)
-        ec2_client.delete_key_pair(KeyName=self.user_name)
+        filters = [{"Name": "tag:User", "Values": [self.user_name]}]
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            key_pair = executor.submit(
+                ec2_client.delete_key_pair, KeyName=self.user_name
+            )
+            reservations = executor.submit(
+                ec2_client.describe_instances, Filters=filters
+            )
+            volumes = executor.submit(ec2_client.describe_volumes, Filters=filters)
+            instance_ids = [
+                instance["InstanceId"]
+                for reservation in reservations.result()["Reservations"]
+                for instance in reservation["Instances"]
+            ]
+            volume_ids = [volume["VolumeId"] for volume in volumes.result()["Volumes"]]
+            if len(instance_ids) > 0:
+                ec2_client.terminate_instances(InstanceIds=instance_ids)
+                waiters = ec2_client.get_waiter("instance_terminated")
+                waiters.wait(InstanceIds=instance_ids)
+            # Volumes can only be deleted once any instance they are attached to is gone.
+            if len(volume_ids) > 0:
+                for volume_id in volume_ids:
+                    ec2_client.delete_volume(VolumeId=volume_id)
+                waiters = ec2_client.get_waiter("volume_deleted")
+                waiters.wait(VolumeIds=volume_ids)
+            key_pair.result()
+
+    def patch_object(self, target: Any, attribute: str, **kwargs: Any) -> Mock:
+        """
+        Patch an attribute of the shared server until the end of the test.
+        """
+        patcher = patch.object(target, attribute, **kwargs)
+        mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        return mock
 
     def mock_post_message(self, mock_chat_post_message: Mock) -> None:
         """
-        Mock the chat_postMessage method and set the event.
+        Mock the chat_postMessage method and queue the messages posted.
         """
 
         def side_effect(**kwargs):
             """
             Side effect for the chat_postMessage method.
             """
-            self.text = kwargs.get("text")
-            self.post_message_event.set()
+            self.messages.put(kwargs)
             return {"ok": True}
 
         mock_chat_post_message.side_effect = side_effect
 
-    def post_event(self, payload: Dict[str, Any], timeout: int) -> None:
+    def expect_message(self, **expected: Any) -> str:
         """
-        Post an event to the server and wait for the response.
+        Check the next message posted has the expected arguments and return its text.
         """
-        self.post_message_event.clear()
-        self.text = ""
+        message = self.messages.get(timeout=self.timeout)
+        for key, value in expected.items():
+            self.assertEqual(message.get(key), value)
+        return message.get("text", "")
 
-        response = requests.post(
-            f"http://localhost:{self.port}/slack/events",
-            json={"payload": json.dumps(payload)},
-            auth=self.slack_auth,
-            timeout=5,
+    def post_event(
+        self, payload: Union[Dict[str, Any], str], as_json: bool = False
+    ) -> None:
+        """
+        Post an event, which may already be serialized to JSON, to the server.
+        """
+        if not isinstance(payload, str):
+            payload = json.dumps(payload)
+        status, _ = SharedServer.post(
+            "/slack/events", {"payload": payload}, as_json=as_json
         )
+        self.assertEqual(status, 200)
 
-        self.post_message_event.wait(timeout=timeout)
-        self.assertEqual(response.status_code, 200)
+    def post_events(self, payloads: Sequence[Union[Dict[str, Any], str]]) -> None:
+        """
+        Post independent events to the server concurrently.
+        """
+        responses = [
+            SharedServer.executor.submit(self.post_event, payload)
+            for payload in payloads
+        ]
+        for response in responses:
+            response.result()
 
-    def post_command(self, payload: Dict[str, Any], timeout: int) -> requests.Response:
+    def post_command(self, payload: Dict[str, Any]) -> bytes:
         """
-        Post a command to the server and wait for the response.
+        Post a command to the server and return the response body.
         """
-        self.post_message_event.clear()
-        self.text = ""
+        status, content = SharedServer.post("/slack/commands", payload)
+        self.assertEqual(status, 200)
+        return content
 
-        response = requests.post(
-            f"http://localhost:{self.port}/slack/commands",
-            data=payload,
-            auth=self.slack_auth,
-            timeout=5,
-        )
+    def view_submission_payload(
+        self, callback_id: str, values: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Build a view submission payload with the given callback ID and state values.
+        """
+        return {
+            "type": "view_submission",
+            "user": {"id": self.user_id, "username": self.user_name},
+            "view": {"callback_id": callback_id, "state": {"values": values}},
+        }
 
-        self.post_message_event.wait(timeout=timeout)
-        self.assertEqual(response.status_code, 200)
-        return response
+    def instance_selection_payload(self, callback_id: str) -> str:
+        """
+        Fill in the pre-serialized instance selection payload.
+        """
+        return (
+            INSTANCE_SELECTION_PAYLOAD.replace("__USER_ID__", self.user_id)
+            .replace("__USER_NAME__", self.user_name)
+            .replace("__CALLBACK_ID__", callback_id)
+            .replace("__INSTANCE_ID__", self.instance_id)
+        )
 
     @staticmethod
     def generate_ssh_key_pair() -> Tuple[str, str]:
         """
-        Generate a dummy SSH public key.
+        Generate a dummy Ed25519 SSH key pair, which is much quicker than RSA.
         """
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048,
-        )
+        private_key = ed25519.Ed25519PrivateKey.generate()
         public_key = private_key.public_key()
         ssh_public_key = public_key.public_bytes(
             encoding=serialization.Encoding.OpenSSH,
@@ -246,7 +438,7 @@ class TestSlackHandler(unittest.TestCase):
         )
         ssh_private_key = private_key.private_bytes(
             encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            format=serialization.PrivateFormat.OpenSSH,
             encryption_algorithm=serialization.NoEncryption(),
         )
         return ssh_public_key.decode("utf-8"), ssh_private_key.decode("utf-8")
@@ -259,234 +451,191 @@ class TestSlackHandler(unittest.TestCase):
         """
         Test operations on instances and volumes in order.
         """
-        self._test_command(mock_views_open, "/ec2", "key")
-        self._test_create_public_key(mock_chat_post_message)
-        self._test_command(mock_views_open, "/ebs", "create")
-        self._test_create_volume(mock_chat_post_message)
+        self.mock_post_message(mock_chat_post_message)
+        self._test_commands(mock_views_open, [("/ec2", "key"), ("/ebs", "create")])
+        self._test_create_public_key_and_volume()
         self._test_command(mock_views_open, "/ec2", "up")
-        self._test_launch_instance(mock_chat_post_message, mount_option="ebs")
-        self._test_terminate_instance(mock_chat_post_message)
-        self._test_launch_instance(mock_chat_post_message, mount_option="efs")
-        self._test_command(mock_views_open, "/ec2", "down")
-        self._test_command(mock_views_open, "/ec2", "stop")
-        self._test_stop_instance(mock_chat_post_message)
+        self._test_launch_instance(mount_option="ebs")
+        self._test_terminate_instance()
+        self._test_launch_instance(mount_option="efs")
+        self._test_commands(mock_views_open, [("/ec2", "down"), ("/ec2", "stop")])
+        self._test_stop_instance()
         self._test_command(mock_views_open, "/ec2", "start")
-        self._test_start_instance(mock_chat_post_message)
-        self._test_status(mock_chat_post_message)
+        self._test_start_instance()
+        self._test_status()
         self._test_command(mock_views_open, "/ec2", "change")
-        self._test_change_instance_type(mock_chat_post_message)
+        self._test_change_instance_type()
         self._test_command(mock_views_open, "/ebs", "resize")
-        self._test_resize_volume(mock_chat_post_message)
+        self._test_resize_volume()
         self._test_command(mock_views_open, "/ebs", "attach")
-        self._test_attach_volume(mock_chat_post_message)
-        self._test_detach_volume(mock_chat_post_message)
-        self._test_destroy_volume(mock_chat_post_message)
-        self._test_terminate_instance(mock_chat_post_message)
+        self._test_attach_volume()
+        self._test_detach_volume()
+        self._test_destroy_volume()
+        self._test_terminate_instance()
 
     def _test_command(self, mock_views_open: Mock, command: str, text: str) -> None:
         """
         Test a command with the given text.
         """
-        logger.info("Testing %s %s", command, text)
-        self.command_payload["command"] = command.replace(
-            "/", f"/{os.getenv('EC2_SLACKBOT_STAGE',  '')}"
+        self._test_commands(mock_views_open, [(command, text)])
+
+    def _test_commands(
+        self, mock_views_open: Mock, commands: Sequence[Tuple[str, str]]
+    ) -> None:
+        """
+        Test independent commands with the given texts, posting them concurrently.
+        """
+        payloads = []
+        for command, text in commands:
+            logger.info("Testing %s %s", command, text)
+            payload = dict(self.command_payload)
+            payload["command"] = command.replace(
+                "/", f"/{os.getenv('EC2_SLACKBOT_STAGE',  '')}"
+            )
+            payload["text"] = text
+            payloads.append(payload)
+        # Appending to call_args_list is atomic, unlike incrementing call_count.
+        call_count = len(mock_views_open.call_args_list)
+        if len(payloads) == 1:
+            self.assertEqual(self.post_command(payloads[0]), b"")
+        else:
+            responses = [
+                SharedServer.executor.submit(self.post_command, payload)
+                for payload in payloads
+            ]
+            for response in responses:
+                self.assertEqual(response.result(), b"")
+        self.assertEqual(
+            len(mock_views_open.call_args_list), call_count + len(commands)
         )
-        self.command_payload["text"] = text
-        call_count = mock_views_open.call_count
-        response = self.post_command(self.command_payload, timeout=0)
-        self.assertEqual(response.text, "")
-        self.assertEqual(mock_views_open.call_count, call_count + 1)
 
-    def _test_create_public_key(self, mock_chat_post_message: Mock) -> None:
+    def _test_create_public_key_and_volume(self) -> None:
         """
-        Test creating a public key.
+        Test creating a public key and a volume, which are independent, concurrently.
         """
-        logger.info("Testing creating a public key")
-        public_key, _ = self.generate_ssh_key_pair()
-        payload = {
-            "type": "view_submission",
-            "user": {"id": self.user_id, "username": self.user_name},
-            "view": {
-                "callback_id": "submit_key",
-                "state": {
-                    "values": {"key_input": {"public_key": {"value": public_key}}}
-                },
+        logger.info("Testing creating a public key and a volume")
+        public_key, _ = self.ssh_key_pair
+        payloads = [
+            self.view_submission_payload(
+                "submit_key",
+                {"key_input": {"public_key": {"value": public_key}}},
+            ),
+            self.view_submission_payload(
+                "create_volume",
+                {"volume_size": {"volume_size_input": {"value": "1"}}},
+            ),
+        ]
+        self.created_resources = True
+        self.post_events(payloads)
+        # The two messages can arrive in either order.
+        texts = {self.expect_message(channel=self.user_id) for _ in payloads}
+        self.assertEqual(
+            texts,
+            {
+                "Public key updated successfully.",
+                "EBS volume of 1 GiB created successfully.",
             },
-        }
-        self.mock_post_message(mock_chat_post_message)
-        self.post_event(payload, timeout=self.timeout)
-        mock_chat_post_message.assert_called_once_with(
-            channel=self.user_id, text="Public key updated successfully."
         )
 
-    def _test_launch_instance(
-        self, mock_chat_post_message: Mock, mount_option: str
-    ) -> None:
+    def _test_launch_instance(self, mount_option: str) -> None:
         """
         Test launching an instance.
         """
         logger.info("Testing launching an instance")
-        launch_payload = {
-            "type": "view_submission",
-            "user": {"id": self.user_id, "username": self.user_name},
-            "view": {
-                "callback_id": "launch_instance",
-                "state": {
-                    "values": {
-                        "ami_choice": {
-                            "ami": {"selected_option": {"value": "Ubuntu 22.04"}}
-                        },
-                        "instance_type_choice": {
-                            "instance_type": {"selected_option": {"value": "t2.micro"}}
-                        },
-                        "root_ebs_size": {"root_ebs_size_input": {"value": "8"}},
-                        "mount_options": {
-                            "mount_input": {"selected_option": {"value": mount_option}}
-                        },
-                        "startup_script": {"startup_script_input": {"value": "ls"}},
-                    }
+        launch_payload = self.view_submission_payload(
+            "launch_instance",
+            {
+                "ami_choice": {"ami": {"selected_option": {"value": "Ubuntu 22.04"}}},
+                "instance_type_choice": {
+                    "instance_type": {"selected_option": {"value": "t2.micro"}}
+                },
+                "root_ebs_size": {"root_ebs_size_input": {"value": "8"}},
+                "mount_options": {
+                    "mount_input": {"selected_option": {"value": mount_option}}
                 },
+                "startup_script": {"startup_script_input": {"value": "ls"}},
             },
-        }
-        self.mock_post_message(mock_chat_post_message)
-        self.post_event(launch_payload, timeout=self.timeout)
-        self.assertIn("launched successfully.", self.text)
-        match = re.search(r"i-[0-9a-fA-F]{17}", self.text)
-        self.instance_id = match.group(0) if match else ""
+        )
+        self.created_resources = True
+        self.post_event(launch_payload)
+        text = self.expect_message(channel=self.user_id)
+        self.assertIn("launched successfully.", text)
+        # Instance IDs are "i-" followed by 17 hex digits.
+        start = text.find("i-")
+        self.instance_id = text[start : start + 19] if start >= 0 else ""
 
-    def _test_stop_instance(self, mock_chat_post_message: Mock) -> None:
+    def _test_stop_instance(self) -> None:
         """
         Test stopping the instance.
         """
         logger.info("Testing stopping the instance")
-        stop_payload = {
-            "type": "view_submission",
-            "user": {"id": self.user_id, "username": self.user_name},
-            "view": {
-                "callback_id": "stop_instance",
-                "state": {
-                    "values": {
-                        "instance_selection": {
-                            "selected_instances": {
-                                "selected_options": [{"value": self.instance_id}]
-                            }
-                        }
-                    }
-                },
-            },
-        }
-        self.post_event(stop_payload, timeout=self.timeout)
-        mock_chat_post_message.assert_called_with(
+        stop_payload = self.instance_selection_payload("stop_instance")
+        # Post this event as JSON rather than as a form, to cover both content types.
+        self.post_event(stop_payload, as_json=True)
+        self.expect_message(
             channel=self.user_id, text=f"Stopped instances: {self.instance_id}"
         )
 
-    def _test_start_instance(self, mock_chat_post_message: Mock) -> None:
+    def _test_start_instance(self) -> None:
         """
         Test starting the instance.
         """
         logger.info("Testing starting the instance")
-        start_payload = {
-            "type": "view_submission",
-            "user": {"id": self.user_id, "username": self.user_name},
-            "view": {
-                "callback_id": "start_instance",
-                "state": {
-                    "values": {
-                        "instance_selection": {
-                            "selected_instances": {
-                                "selected_options": [{"value": self.instance_id}]
-                            }
-                        }
-                    }
-                },
-            },
-        }
-        self.post_event(start_payload, timeout=self.timeout)
-        mock_chat_post_message.assert_called_with(
+        start_payload = self.instance_selection_payload("start_instance")
+        self.post_event(start_payload)
+        self.expect_message(
             channel=self.user_id, text=f"Started instances: {self.instance_id}"
         )
 
-    def _test_status(self, mock_chat_post_message: Mock) -> None:
+    def _test_status(self) -> None:
         """
         Test status.
         """
         logger.info("Testing status")
         self.command_payload["command"] = f"/{os.getenv('EC2_SLACKBOT_STAGE', '')}ec2"
         self.command_payload["text"] = "status"
-        response = self.post_command(self.command_payload, timeout=self.timeout)
-        self.assertEqual(response.json()["text"], "Fetching status...")
-        mock_chat_post_message.assert_called_with(
+        response = self.post_command(self.command_payload)
+        self.assertEqual(json.loads(response)["text"], "Fetching status...")
+        self.expect_message(
             channel=self.user_id,
             text=f"Running instances:\n*{self.user_name}*\n- {self.instance_id} (t2.micro): 0 days\n",
         )
 
-    def _test_change_instance_type(self, mock_chat_post_message: Mock) -> None:
+    def _test_change_instance_type(self) -> None:
         """
         Test changing the instance type.
         """
         logger.info("Testing changing the instance type")
-        change_payload = {
-            "type": "view_submission",
-            "user": {"id": self.user_id, "username": self.user_name},
-            "view": {
-                "callback_id": "change_instance",
-                "state": {
-                    "values": {
-                        "instance_selection": {
-                            "selected_instances": {
-                                "selected_option": {"value": self.instance_id}
-                            }
-                        },
-                        "instance_type_choice": {
-                            "instance_type": {"selected_option": {"value": "t3.medium"}}
-                        },
+        change_payload = self.view_submission_payload(
+            "change_instance",
+            {
+                "instance_selection": {
+                    "selected_instances": {
+                        "selected_option": {"value": self.instance_id}
                     }
                 },
+                "instance_type_choice": {
+                    "instance_type": {"selected_option": {"value": "t3.medium"}}
+                },
             },
-        }
-        self.post_event(change_payload, timeout=self.timeout)
-        mock_chat_post_message.assert_called_with(
+        )
+        self.post_event(change_payload)
+        self.expect_message(
             channel=self.user_id,
             text=f"Changed instance {self.instance_id} to type t3.medium successfully.",
         )
 
-    def _test_create_volume(self, mock_chat_post_message: Mock) -> None:
-        """
-        Test creating a volume.
-        """
-        logger.info("Testing creating a volume")
-        create_volume_payload = {
-            "type": "view_submission",
-            "user": {"id": self.user_id, "username": self.user_name},
-            "view": {
-                "callback_id": "create_volume",
-                "state": {
-                    "values": {"volume_size": {"volume_size_input": {"value": "1"}}}
-                },
-            },
-        }
-        self.post_event(create_volume_payload, timeout=self.timeout)
-        mock_chat_post_message.assert_called_with(
-            channel=self.user_id, text="EBS volume of 1 GiB created successfully."
-        )
-
-    def _test_resize_volume(self, mock_chat_post_message: Mock) -> None:
+    def _test_resize_volume(self) -> None:
         """
         Test resizing a volume.
         """
         logger.info("Testing resizing a volume")
-        resize_volume_payload = {
-            "type": "view_submission",
-            "user": {"id": self.user_id, "username": self.user_name},
-            "view": {
-                "callback_id": "resize_volume",
-                "state": {
-                    "values": {"volume_size": {"volume_size_input": {"value": "2"}}}
-                },
-            },
-        }
-        self.post_event(resize_volume_payload, timeout=self.timeout)
-        mock_chat_post_message.assert_called_with(
+        resize_volume_payload = self.view_submission_payload(
+            "resize_volume",
+            {"volume_size": {"volume_size_input": {"value": "2"}}},
+        )
+        self.post_event(resize_volume_payload)
+        self.expect_message(
             channel=self.user_id,
             text=(
                 "EBS volume resized to 2 GiB successfully. "
@@ -494,82 +643,61 @@ class TestSlackHandler(unittest.TestCase):
             ),
         )
 
-    def _test_attach_volume(self, mock_chat_post_message: Mock) -> None:
+    def _test_attach_volume(self) -> None:
         """
         Test attaching a volume.
         """
         logger.info("Testing attaching a volume")
-        attach_volume_payload = {
-            "type": "view_submission",
-            "user": {"id": self.user_id, "username": self.user_name},
-            "view": {
-                "callback_id": "attach_volume",
-                "state": {
-                    "values": {
-                        "instance_selection": {
-                            "selected_instance": {
-                                "selected_option": {"value": self.instance_id}
-                            }
-                        }
+        attach_volume_payload = self.view_submission_payload(
+            "attach_volume",
+            {
+                "instance_selection": {
+                    "selected_instance": {
+                        "selected_option": {"value": self.instance_id}
                     }
-                },
+                }
             },
-        }
-        self.post_event(attach_volume_payload, timeout=self.timeout)
-        mock_chat_post_message.assert_called_with(
+        )
+        self.post_event(attach_volume_payload)
+        self.expect_message(
             channel=self.user_id,
             text=f"EBS volume attached to instance {self.instance_id} successfully.",
         )
 
-    def _test_detach_volume(self, mock_chat_post_message: Mock) -> None:
+    def _test_detach_volume(self) -> None:
         """
         Test detaching a volume.
         """
         logger.info("Testing detaching a volume")
         self.command_payload["command"] = f"/{os.getenv('EC2_SLACKBOT_STAGE', '')}ebs"
         self.command_payload["text"] = "detach"
-        response = self.post_command(self.command_payload, timeout=self.timeout)
-        self.assertEqual(response.json()["text"], "Detaching EBS volume...")
-        mock_chat_post_message.assert_called_with(
+        response = self.post_command(self.command_payload)
+        self.assertEqual(json.loads(response)["text"], "Detaching EBS volume...")
+        self.expect_message(
             channel=self.user_id, text="EBS volume detached successfully."
         )
 
-    def _test_destroy_volume(self, mock_chat_post_message: Mock) -> None:
+    def _test_destroy_volume(self) -> None:
         """
         Test destroying a volume.
         """
         logger.info("Testing destroying a volume")
         self.command_payload["command"] = f"/{os.getenv('EC2_SLACKBOT_STAGE', '')}ebs"
         self.command_payload["text"] = "destroy please"
-        response = self.post_command(self.command_payload, timeout=self.timeout)
-        self.assertEqual(response.json()["text"], "Destroying EBS volume...")
-        mock_chat_post_message.assert_called_with(
+        response = self.post_command(self.command_payload)
+        self.assertEqual(json.loads(response)["text"], "Destroying EBS volume...")
+        self.expect_message(
             channel=self.user_id, text="EBS volume destroyed successfully."
         )
 
-    def _test_terminate_instance(self, mock_chat_post_message: Mock) -> None:
+    def _test_terminate_instance(self) -> None:
         """
         Test terminating the instance.
         """
         logger.info("Testing terminating the instance")
-        terminate_payload = {
-            "type": "view_submission",
-            "user": {"id": self.user_id, "username": self.user_name},
-            "view": {
-                "callback_id": "terminate_instance",
-                "state": {
-                    "values": {
-                        "instance_selection": {
-                            "selected_instances": {
-                                "selected_options": [{"value": self.instance_id}]
-                            }
-                        }
-                    }
-                },
-            },
-        }
-        self.post_event(terminate_payload, timeout=self.timeout)
-        mock_chat_post_message.assert_called_with(
+        terminate_payload = self.instance_selection_payload("terminate_instance")
+        self.post_event(terminate_payload)
+        self.expect_message(
             channel=self.user_id, text=f"Terminated instances: {self.instance_id}"
         )
 
@@ -586,12 +714,16 @@ class TestSlackHandler(unittest.TestCase):
         large_instance_type = "t3.large"
         large_running_days = 2
 
-        slack_handler = self.web_server.slack_handler
-        slack_handler.get_all_user_ids = Mock(
-            return_value={self.user_name: self.user_id}
-        )
+        # The server is shared by all tests, so restore these methods afterwards.
         instance_checker = self.web_server.instance_checker
-        instance_checker.aws_handler.get_running_instance_details = Mock(
+        self.patch_object(
+            self.web_server.slack_handler,
+            "get_all_user_ids",
+            return_value={self.user_name: self.user_id},
+        )
+        self.patch_object(
+            instance_checker.aws_handler,
+            "get_running_instance_details",
             return_value=[
                 {
                     "instance_id": small_instance_id,
@@ -607,24 +739,19 @@ class TestSlackHandler(unittest.TestCase):
                     "user_name": self.user_name,
                     "running_days": large_running_days,
                 },
-            ]
+            ],
         )
         instance_checker.periodically_check_instances()
 
-        mock_chat_post_message.assert_any_call(
-            channel=self.user_id,
-            text=(
-                f"Warning: Your instance {small_instance_id} ({small_instance_type}) "
-                f"has been running for {small_running_days} days. "
-                "Please consider terminating it with /ec2 down."
-            ),
-        )
-        mock_chat_post_message.assert_any_call(
+        mock_chat_post_message.assert_called_once_with(
             channel=self.user_id,
             text=(
-                f"Warning: Your instance {large_instance_id} ({large_instance_type}) "
-                f"has been running for {large_running_days} days. "
-                "Please consider terminating it with /ec2 down."
+                "Warning: The following instances have been running for a while. "
+                "Please consider terminating them with /ec2 down.\n"
+                f"- {small_instance_id} ({small_instance_type}): "
+                f"{small_running_days} days\n"
+                f"- {large_instance_id} ({large_instance_type}): "
+                f"{large_running_days} days\n"
             ),
         )
 
@@ -638,7 +765,7 @@ class TestSlackHandler(unittest.TestCase):
         client = paramiko.SSHClient()
         client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         private_key_file = StringIO(private_key_text)
-        private_key = paramiko.RSAKey.from_private_key(private_key_file)
+        private_key = paramiko.Ed25519Key.from_private_key(private_key_file)
         proxy_command = (
             f"aws ssm start-session --target {hostname} "
             f"--document-name AWS-StartSSHSession --parameters portNumber=22"
@@ -661,9 +788,10 @@ class TestSlackHandler(unittest.TestCase):
             return
 
         logger.info("Testing SSH")
-        public_key, private_key = self.generate_ssh_key_pair()
+        public_key, private_key = self.ssh_key_pair
         ami = self.web_server.config["amis"]["Amazon Linux 2"]
         aws_handler = self.web_server.slack_handler.aws_handler
+        self.created_resources = True
         aws_handler.create_key_pair(user_name=self.user_name, public_key=public_key)
         instance_id = aws_handler.launch_ec2_instance(
             ami_id=ami["id"],
@@ -677,5 +805,165 @@ class TestSlackHandler(unittest.TestCase):
         aws_handler.terminate_ec2_instances(instance_ids=[instance_id])
 
 
+class TestSlackSignature(unittest.TestCase):
+    """
+    A class to test that requests without a valid Slack signature are rejected.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up a test client for the shared server before each test.
+        """
+        self.client = SharedServer.web_server.app.test_client()
+        self.slack_auth = SharedServer.slack_auth
+        self.body = b"payload=%7B%7D"
+
+    def post(self, headers: Dict[str, str]) -> int:
+        """
+        Post the body to the events endpoint and return the status code.
+        """
+        response = self.client.post(
+            "/slack/events",
+            data=self.body,
+            headers=headers,
+            content_type="application/x-www-form-urlencoded",
+        )
+        return response.status_code
+
+    def test_non_ascii_timestamp(self) -> None:
+        """
+        Test that a timestamp of non-ASCII digits is rejected.
+        """
+        headers = self.slack_auth.sign(self.body)
+        headers["X-Slack-Request-Timestamp"] = "\u00b2"
+        self.assertEqual(self.post(headers), 400)
+
+    def test_long_timestamp(self) -> None:
+        """
+        Test that a timestamp with too many digits to convert is rejected.
+        """
+        headers = self.slack_auth.sign(self.body, timestamp="1" * 5000)
+        self.assertEqual(self.post(headers), 400)
+
+    def test_stale_timestamp(self) -> None:
+        """
+        Test that a correctly signed request with a stale timestamp is rejected.
+        """
+        timestamp = str(int(time.time()) - 60 * 10)
+        headers = self.slack_auth.sign(self.body, timestamp=timestamp)
+        self.assertEqual(self.post(headers), 400)
+
+    def test_future_timestamp(self) -> None:
+        """
+        Test that a correctly signed request with a future timestamp is rejected.
+        """
+        timestamp = str(int(time.time()) + 60 * 10)
+        headers = self.slack_auth.sign(self.body, timestamp=timestamp)
+        self.assertEqual(self.post(headers), 400)
+
+    def test_wrong_signature(self) -> None:
+        """
+        Test that a request signed with a different secret is rejected.
+        """
+        headers = SlackAuth(secret="wrong").sign(self.body)
+        self.assertEqual(self.post(headers), 400)
+
+    def test_missing_version(self) -> None:
+        """
+        Test that a signature without the version prefix is rejected.
+        """
+        headers = self.slack_auth.sign(self.body)
+        headers["X-Slack-Signature"] = headers["X-Slack-Signature"][3:]
+        self.assertEqual(self.post(headers), 400)
+
+    def test_bad_hex(self) -> None:
+        """
+        Test that a signature which is not hexadecimal is rejected.
+        """
+        headers = self.slack_auth.sign(self.body)
+        headers["X-Slack-Signature"] = "v0=" + "z" * 64
+        self.assertEqual(self.post(headers), 400)
+
+    def test_non_canonical_hex(self) -> None:
+        """
+        Test that a signature with whitespace between the hex digits is rejected.
+        """
+        headers = self.slack_auth.sign(self.body)
+        signature = headers["X-Slack-Signature"]
+        headers["X-Slack-Signature"] = f"{signature[:5]} {signature[5:]}"
+        self.assertEqual(self.post(headers), 400)
+
+    def test_missing_headers(self) -> None:
+        """
+        Test that a request without a timestamp or signature is rejected.
+        """
+        self.assertEqual(self.post({}), 400)
+
+    def test_commands(self) -> None:
+        """
+        Test that commands with an invalid signature are rejected too.
+        """
+        headers = SlackAuth(secret="wrong").sign(self.body)
+        response = self.client.post(
+            "/slack/commands",
+            data=self.body,
+            headers=headers,
+            content_type="application/x-www-form-urlencoded",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class TestSlackSender(unittest.TestCase):
+    """
+    A class to test the SlackSender class.
+    """
+
+    def setUp(self) -> None:
+        """
+        Set up a SlackSender with a fake clock before each test.
+        """
+        self.now = 100.0
+        self.sender = SlackSender(
+            WebClient(token=os.environ["SLACK_BOT_TOKEN"]),
+            messages_per_second=1.0,
+            burst=3,
+            clock=lambda: self.now,
+        )
+
+    def test_reserve(self) -> None:
+        """
+        Test that a burst is sent straight away and later messages are paced.
+        """
+        self.assertEqual(
+            [self.sender.reserve("U12345") for _ in range(3)], [0.0, 0.0, 0.0]
+        )
+        self.assertEqual(self.sender.reserve("U12345"), 1.0)
+        self.assertEqual(self.sender.reserve("U12345"), 2.0)
+        self.assertEqual(self.sender.reserve("U67890"), 0.0)
+        self.now += 10.0
+        self.assertEqual(self.sender.reserve("U12345"), 0.0)
+
+    def test_invalid_rate(self) -> None:
+        """
+        Test that a negative rate or a burst of less than one is rejected.
+        """
+        client = WebClient(token=os.environ["SLACK_BOT_TOKEN"])
+        with self.assertRaises(ValueError):
+            SlackSender(client, messages_per_second=-1.0)
+        with self.assertRaises(ValueError):
+            SlackSender(client, burst=0)
+
+    def test_reserve_disabled(self) -> None:
+        """
+        Test that a rate of zero turns pacing off.
+        """
+        sender = SlackSender(
+            WebClient(token=os.environ["SLACK_BOT_TOKEN"]),
+            messages_per_second=0,
+            clock=lambda: self.now,
+        )
+        self.assertEqual([sender.reserve("U12345") for _ in range(10)], [0.0] * 10)
+
+
 if __name__ == "__main__":
     unittest.main()